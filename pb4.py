@@ -1,17 +1,23 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import pandas as pd
+import csv
+import hashlib
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 import os
 
 # Constants
 ELEMENT_TYPES = ['role', 'goal', 'audience', 'context', 'output', 'tone']
 CSV_COLUMNS = ['title', 'type', 'content']
 PROMPT_HISTORY_COLUMNS = ['name', 'timestamp', 'prompt']
+EDITOR_PAGE_SIZE = 20
+HISTORY_SHOW_LAST = 20
+COMPACT_DELETED_RATIO = 0.25
+SESSION_KEYS = {'prompt_elements.csv': 'elements_df', 'prompt_history.csv': 'history_df'}
 
 # Custom theme and styling
-def set_theme():
-    st.markdown("""
+_THEME_CSS = """
     <style>
     /* Modern dark theme inspired by shadcn */
     :root {
@@ -44,14 +50,14 @@ def set_theme():
     }
 
     /* Button styling - updated for better contrast */
-    .stButton > button {
+    .stButton > button, .stFormSubmitButton > button {
         background-color: var(--secondary) !important;
         color: var(--foreground) !important;
         border: 1px solid var(--border) !important;
         width: 100%;
     }
 
-    .stButton > button:hover {
+    .stButton > button:hover, .stFormSubmitButton > button:hover {
         background-color: var(--muted) !important;
         border-color: var(--primary) !important;
     }
@@ -61,138 +67,393 @@ def set_theme():
         border-color: var(--border) !important;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+def set_theme():
+    st.markdown(_THEME_CSS, unsafe_allow_html=True)
+
+def rerun_tab():
+    # Rerun just the calling tab's fragment; fall back to a full rerun when the
+    # click arrived during a full-app run, where fragment scope is rejected
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
 # Data management
+@st.cache_data(show_spinner=False)
+def _load_cached(filename: str, mtime: float) -> pd.DataFrame:
+    # mtime is only part of the cache key: a changed file gets a fresh parse.
+    # Every column is text, so skip dtype inference and NA detection.
+    df = pd.read_csv(filename, dtype=str, na_filter=False)
+    tombstones = DataManager.read_tombstones(filename)
+    if tombstones:
+        # Hide rows deleted since the last full rewrite; the index keeps their file positions.
+        # An entry only applies while the row at that position still has the logged hash, so a
+        # store replaced or hand-edited under the log (git checkout, manual edit) hides nothing.
+        deleted = [
+            position for position, row_hash in tombstones
+            if position < len(df) and DataManager.row_hash(df.iloc[position].tolist()) == row_hash
+        ]
+        # .copy() so the type conversion below writes to a frame of its own, not a filtered view
+        df = df[~df.index.isin(deleted)].copy()
+    if 'type' in df.columns:
+        # Element types are a small fixed set, so store them as categorical codes for cheap
+        # masks and groupby; unknown types in the file become extra categories, not NaN
+        extra_types = sorted(set(df['type']) - set(ELEMENT_TYPES))
+        df['type'] = df['type'].astype(pd.CategoricalDtype(categories=ELEMENT_TYPES + extra_types))
+    return df
+
+@st.cache_data(show_spinner=False)
+def _history_csv_bytes(mtime: float) -> bytes:
+    # The store is already CSV, so the download payload is the file itself;
+    # keyed on mtime so it is only re-read after a save
+    with open('prompt_history.csv', 'rb') as f:
+        return f.read()
+
+@st.cache_data(show_spinner=False)
+def _elements_by_type(mtime: float) -> Dict[str, List[Tuple[int, str, str]]]:
+    # (row index, title, content) per type, so renderers build widgets from plain lists
+    df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
+    return {
+        t: list(zip(g.index.tolist(), g['title'], g['content']))
+        for t, g in df.groupby('type', sort=False, observed=True)
+    }
+
+@st.cache_data(show_spinner=False)
+def _title_to_content(mtime: float) -> Dict[str, str]:
+    df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
+    # Reversed so the first row wins on duplicate titles, matching the old .values[0] lookup
+    return dict(zip(df['title'][::-1], df['content'][::-1]))
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _build_prompt(selections_key: Tuple[Tuple[str, Any, str], ...], recursive_feedback: bool, mtime: float) -> str:
+    # Memoized on the builder state, so reruns that leave the selections unchanged skip prompt assembly
+    selections = {
+        section: {'selected': list(sel) if isinstance(sel, tuple) else sel, 'custom': custom}
+        for section, sel, custom in selections_key
+    }
+    return PromptBuilder._generate_prompt(selections, _title_to_content(mtime), recursive_feedback)
+
 class DataManager:
+    @staticmethod
+    def get_mtime(filename: str) -> float:
+        return os.path.getmtime(filename) if os.path.exists(filename) else 0
+
+    @staticmethod
+    def clear_caches() -> None:
+        # mtime keys already change on write; clearing also covers coarse mtime resolution
+        _load_cached.clear()
+        _history_csv_bytes.clear()
+        _elements_by_type.clear()
+        _title_to_content.clear()
+        _build_prompt.clear()
+        # Same fallback for this session's copies: forget their versions so the next access reloads
+        for key in SESSION_KEYS.values():
+            st.session_state.pop(f"{key}_mtime", None)
+
     @staticmethod
     def load_data(filename: str, columns: List[str]) -> pd.DataFrame:
+        # A missing store is just empty; the file and its header are created on first write
         if not os.path.exists(filename):
-            df = pd.DataFrame(columns=columns)
-            df.to_csv(filename, index=False)
-            return df
-        return pd.read_csv(filename)
+            return pd.DataFrame(columns=columns)
+        # st.cache_data hands back a fresh copy per call, so callers may mutate the result
+        return _load_cached(filename, DataManager.get_mtime(filename))
+
+    @staticmethod
+    def get_session_data(filename: str, columns: List[str]) -> pd.DataFrame:
+        # One parsed copy per browser session, reused across reruns. It is re-read only when the
+        # file changed underneath it, e.g. after an append or an edit from another browser tab.
+        key = SESSION_KEYS[filename]
+        mtime = DataManager.get_mtime(filename)
+        if st.session_state.get(f"{key}_mtime") != mtime:
+            st.session_state[key] = DataManager.load_data(filename, columns)
+            st.session_state[f"{key}_mtime"] = mtime
+        return st.session_state[key]
+
+    @staticmethod
+    def tombstone_path(filename: str) -> str:
+        return f"{filename}.deleted"
+
+    @staticmethod
+    def row_hash(values: Sequence[str]) -> str:
+        return hashlib.sha1("\x1f".join(map(str, values)).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def read_tombstones(filename: str) -> List[Tuple[int, str]]:
+        path = DataManager.tombstone_path(filename)
+        if not os.path.exists(path):
+            return []
+        tombstones = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                position, _, row_hash = line.strip().partition(',')
+                # Skip anything that is not a "<position>,<hash>" entry rather than guess
+                if position.isdigit() and row_hash:
+                    tombstones.append((int(position), row_hash))
+        return tombstones
+
+    @staticmethod
+    def delete_row(filename: str, columns: List[str], index: int) -> None:
+        # Log the deleted row's file position instead of rewriting the file. Positions stay
+        # valid because the store is only appended to between full rewrites; the row hash
+        # guards against the file being swapped out underneath the log.
+        # Hash the whole row in file column order, exactly as the loader does when it checks the log
+        row = DataManager.get_session_data(filename, columns).loc[index].tolist()
+        with open(DataManager.tombstone_path(filename), 'a', encoding='utf-8') as f:
+            f.write(f"{index},{DataManager.row_hash(row)}\n")
+        # Bump the store's mtime so every mtime-keyed cache sees the delete
+        os.utime(filename)
+        DataManager.clear_caches()
+        deleted = len({position for position, _ in DataManager.read_tombstones(filename)})
+        df = DataManager.get_session_data(filename, columns)
+        # Compact lazily, once tombstoned rows make up a large share of the file
+        if deleted > COMPACT_DELETED_RATIO * (len(df) + deleted):
+            DataManager.save_data(df, filename)
 
     @staticmethod
     def save_data(df: pd.DataFrame, filename: str) -> None:
-        df.to_csv(filename, index=False)
+        # A full rewrite only holds live rows, so it also compacts away the tombstones.
+        # Drop them first: failing mid-write can then only resurrect rows, not hide the wrong ones.
+        tombstones = DataManager.tombstone_path(filename)
+        if os.path.exists(tombstones):
+            os.remove(tombstones)
+        # One large buffered handle, no per-write flush or fsync
+        with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            df.to_csv(f, index=False)
+        DataManager.clear_caches()
+        if filename in SESSION_KEYS:
+            # Keep the session copy in step without re-reading; the rewrite renumbers rows as a reload would
+            key = SESSION_KEYS[filename]
+            st.session_state[key] = df.reset_index(drop=True)
+            st.session_state[f"{key}_mtime"] = DataManager.get_mtime(filename)
+
+    @staticmethod
+    def read_header(filename: str) -> Optional[List[str]]:
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            return None
+        # utf-8-sig: editors such as Notepad may have saved the store with a BOM
+        with open(filename, newline='', encoding='utf-8-sig') as f:
+            # A blank first line counts as no header at all; pandas skips blank lines on read
+            return next(csv.reader(f), None) or None
+
+    @staticmethod
+    def append_rows(filename: str, columns: List[str], rows: List[Sequence[str]], buffering: int = 1 << 16) -> None:
+        # Append-only write: O(rows) instead of re-reading and rewriting the whole file
+        header = DataManager.read_header(filename)
+        if header is not None and not set(columns) <= set(header):
+            # A hand-edited header we cannot line values up with; fall back to a full rewrite
+            df = DataManager.load_data(filename, columns)
+            DataManager.save_data(pd.concat([df, pd.DataFrame(rows, columns=columns)], ignore_index=True), filename)
+            return
+        if header is not None and header != columns:
+            # Hand-reordered or extra columns: place each value under its own header, blanks elsewhere
+            positions = {c: i for i, c in enumerate(columns)}
+            rows = [[row[positions[c]] if c in positions else '' for c in header] for row in rows]
+        starts_mid_line = False
+        if header is not None:
+            with open(filename, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                starts_mid_line = f.read(1) != b'\n'
+        with open(filename, 'a', newline='', encoding='utf-8', buffering=buffering) as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            if header is None:
+                writer.writerow(columns)
+            elif starts_mid_line:
+                # The last record was saved without a line terminator (e.g. by a text editor)
+                f.write(os.linesep)
+            writer.writerows(rows)
+        DataManager.clear_caches()
+
+    @staticmethod
+    def bulk_add(rows: List[Tuple[str, str, str]]) -> None:
+        # The whole batch goes through one handle and one writerows call
+        DataManager.append_rows('prompt_elements.csv', CSV_COLUMNS, rows, buffering=1 << 20)
 
     @staticmethod
     def save_prompt(name: str, prompt: str) -> None:
-        df = DataManager.load_data('prompt_history.csv', PROMPT_HISTORY_COLUMNS)
         # CHANGE: Formatted timestamp for better readability in history
-        new_row = pd.DataFrame({
-            'name': [name],
-            'timestamp': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
-            'prompt': [prompt]
-        })
-        df = pd.concat([df, new_row], ignore_index=True)
-        DataManager.save_data(df, 'prompt_history.csv')
+        row = [name, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), prompt]
+        DataManager.append_rows('prompt_history.csv', PROMPT_HISTORY_COLUMNS, [row])
 
 # UI Components
 class ElementCreator:
     @staticmethod
+    @st.fragment
     def render():
         with st.expander("Create New Element", expanded=False):
-            col1, col2 = st.columns(2)
-            with col1:
-                element_type = st.selectbox("Type", ELEMENT_TYPES, key="new_type")
-                title = st.text_input("Title", key="new_title")
-            with col2:
-                content = st.text_area("Content", key="new_content", height=100)
+            # Batch the inputs in a form so keystrokes do not trigger reruns; only submitting does
+            with st.form("new_element", clear_on_submit=True):
+                col1, col2 = st.columns(2)
+                with col1:
+                    element_type = st.selectbox("Type", ELEMENT_TYPES, key="new_type")
+                    title = st.text_input("Title", key="new_title")
+                with col2:
+                    content = st.text_area("Content", key="new_content", height=100)
             
-            if st.button("Add Element", key="add_element"):
-                if title and content:
-                    df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
-                    new_row = pd.DataFrame({'title': [title], 'type': [element_type], 'content': [content]})
-                    df = pd.concat([df, new_row], ignore_index=True)
-                    DataManager.save_data(df, 'prompt_elements.csv')
-                    st.success("Element added successfully!")
-                    # CHANGE: Use st.rerun() to refresh the list in other tabs
-                    st.rerun()
-                else:
-                    st.error("Please provide both a title and content.")
+                if st.form_submit_button("Add Element", key="add_element"):
+                    if title and content:
+                        DataManager.append_rows('prompt_elements.csv', CSV_COLUMNS, [[title, element_type, content]])
+                        st.success("Element added successfully!")
+                        # CHANGE: Use st.rerun() to refresh the list in other tabs
+                        st.rerun()
+                    else:
+                        st.error("Please provide both a title and content.")
+
+            uploaded = st.file_uploader("Import elements from CSV", type="csv", key="import_file")
+            if uploaded is not None and st.button("Import Elements", key="import_elements"):
+                ElementCreator._import_csv(uploaded)
+
+    @staticmethod
+    def _import_csv(uploaded) -> None:
+        try:
+            imported = pd.read_csv(uploaded, dtype=str, na_filter=False)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as e:
+            st.error(f"Could not read CSV: {e}")
+            return
+        missing = [c for c in CSV_COLUMNS if c not in imported.columns]
+        if missing:
+            st.error(f"CSV is missing column(s): {', '.join(missing)}")
+            return
+        unknown = sorted(set(imported['type']) - set(ELEMENT_TYPES))
+        if unknown:
+            st.error(f"Unknown element type(s): {', '.join(unknown)}")
+            return
+        # Same rule as the single-element form: every element needs a title and content
+        incomplete = int(((imported['title'] == "") | (imported['content'] == "")).sum())
+        if incomplete:
+            st.error(f"{incomplete} row(s) are missing a title or content. Please provide both for every element.")
+            return
+        if imported.empty:
+            st.error("CSV contains no elements.")
+            return
+        DataManager.bulk_add(list(imported[CSV_COLUMNS].itertuples(index=False, name=None)))
+        st.success(f"Imported {len(imported)} elements!")
+        st.rerun()
 
 class ElementEditor:
     @staticmethod
+    @st.fragment
     def render():
-        # CHANGE: Load the dataframe once at the beginning of the render method
-        df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
+        mtime = DataManager.get_mtime('prompt_elements.csv')
+        by_type = _elements_by_type(mtime)
         
-        if df.empty:
+        if not by_type:
             st.warning("No elements found. Please create some elements first.")
             return
 
         col1, col2 = st.columns(2)
         with col1:
-            all_types = ['All'] + sorted(df['type'].unique().tolist())
+            all_types = ['All'] + sorted(by_type)
             selected_type = st.selectbox("Filter by Type", all_types, key="filter_type")
         
         # CHANGE: Filter view based on selection
-        filtered_df = df if selected_type == 'All' else df[df['type'] == selected_type]
+        if selected_type == 'All':
+            # Row indices are unique, so this restores file order across types
+            rows = sorted((i, t, title, content) for t, items in by_type.items() for i, title, content in items)
+        else:
+            rows = [(i, selected_type, title, content) for i, title, content in by_type.get(selected_type, [])]
         
-        if filtered_df.empty:
+        if not rows:
             st.warning(f"No elements found for type: {selected_type}")
             return
         
-        for index, row in filtered_df.iterrows():
-            with st.expander(f"{row['title']} ({row['type']})", expanded=False):
-                col1, col2 = st.columns(2)
-                with col1:
-                    new_title = st.text_input("Title", value=row['title'], key=f"title_{index}")
-                    # CHANGE: Safety check for index alignment in selectbox
-                    current_type_idx = ELEMENT_TYPES.index(row['type']) if row['type'] in ELEMENT_TYPES else 0
-                    new_type = st.selectbox("Type", ELEMENT_TYPES, index=current_type_idx, key=f"type_{index}")
-                with col2:
-                    new_content = st.text_area("Content", value=row['content'], key=f"content_{index}", height=100)
+        # Only build widgets for one page of elements; the widget count otherwise grows with the table
+        page_count = -(-len(rows) // EDITOR_PAGE_SIZE)
+        page = 1
+        if page_count > 1:
+            # Keep the stored page in range when a filter change or delete shrinks the list
+            if st.session_state.get("editor_page", 1) > page_count:
+                st.session_state.editor_page = page_count
+            with col2:
+                page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="editor_page")
+        start = (page - 1) * EDITOR_PAGE_SIZE
+        # Collapsed expanders still build their contents, so rows only get their form once opened
+        # The keys below embed the mtime, so entries from an older file version can never match
+        # again; start a fresh set when the file changes instead of letting the old ones pile up
+        if st.session_state.get('opened_editors_mtime') != mtime:
+            st.session_state.opened_editors = set()
+            st.session_state.opened_editors_mtime = mtime
+        opened_editors = st.session_state.opened_editors
+
+        for index, element_type, title, content in rows[start:start + EDITOR_PAGE_SIZE]:
+            # A full rewrite renumbers rows, so widget state is tied to the file version too;
+            # otherwise a form could keep showing the values of the row that used to hold this index
+            row_key = f"{index}_{mtime}"
+            with st.expander(f"{title} ({element_type})", expanded=False):
+                if row_key not in opened_editors:
+                    if st.button("Edit", key=f"open_{row_key}"):
+                        opened_editors.add(row_key)
+                        rerun_tab()
+                    continue
+                # One form per element: typing in its fields no longer reruns the tab, only Update/Delete do
+                with st.form(f"edit_{row_key}", border=False):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        new_title = st.text_input("Title", value=title, key=f"title_{row_key}")
+                        # CHANGE: Safety check for index alignment in selectbox
+                        current_type_idx = ELEMENT_TYPES.index(element_type) if element_type in ELEMENT_TYPES else 0
+                        new_type = st.selectbox("Type", ELEMENT_TYPES, index=current_type_idx, key=f"type_{row_key}")
+                    with col2:
+                        new_content = st.text_area("Content", value=content, key=f"content_{row_key}", height=100)
                 
-                c1, c2 = st.columns(2)
-                with c1:
-                    if st.button("Update", key=f"update_{index}"):
-                        # CHANGE: Modifying the master df using the original index from filtered_df
-                        df.at[index, 'title'] = new_title
-                        df.at[index, 'type'] = new_type
-                        df.at[index, 'content'] = new_content
-                        DataManager.save_data(df, 'prompt_elements.csv')
-                        st.success("Updated!")
-                        # CHANGE: Fixed function from st._rerun() to st.rerun()
-                        st.rerun()
-                with c2:
-                    if st.button("Delete", key=f"delete_{index}"):
-                        # CHANGE: Standardized deletion using drop
-                        df = df.drop(index)
-                        DataManager.save_data(df, 'prompt_elements.csv')
-                        st.success("Deleted!")
-                        # CHANGE: Fixed function from st._rerun() to st.rerun()
-                        st.rerun()
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        if st.form_submit_button("Update", key=f"update_{row_key}"):
+                            # The master frame is only touched on an actual write; row indices match it
+                            df = DataManager.get_session_data('prompt_elements.csv', CSV_COLUMNS)
+                            df.at[index, 'title'] = new_title
+                            df.at[index, 'type'] = new_type
+                            df.at[index, 'content'] = new_content
+                            DataManager.save_data(df, 'prompt_elements.csv')
+                            st.success("Updated!")
+                            # Only this tab needs redrawing; the others reload on their next interaction
+                            rerun_tab()
+                    with c2:
+                        if st.form_submit_button("Delete", key=f"delete_{row_key}"):
+                            DataManager.delete_row('prompt_elements.csv', CSV_COLUMNS, index)
+                            st.success("Deleted!")
+                            rerun_tab()
 
 class PromptBuilder:
     @staticmethod
+    @st.fragment
     def render():
-        df = DataManager.load_data('prompt_elements.csv', CSV_COLUMNS)
+        # Cached per file version, so a rerun does no pandas work here
+        mtime = DataManager.get_mtime('prompt_elements.csv')
+        by_type = _elements_by_type(mtime)
+        # Build each section's option list once instead of inside every _create_section call
+        base_options = ["Skip", "Write your own"]
+        # Every section's type gets an entry, even with no elements, so lookups below never miss
+        options = {
+            t: [*base_options, *(element_title for _, element_title, _ in by_type.get(t, []))]
+            for t in ELEMENT_TYPES
+        }
         
         col1, col2, col3 = st.columns(3)
         selections = {}
         
         with col1:
-            selections['role'] = PromptBuilder._create_section("Role", 'role', df)
-            selections['goal'] = PromptBuilder._create_section("Goal", 'goal', df)
+            selections['role'] = PromptBuilder._create_section("Role", 'role', options['role'])
+            selections['goal'] = PromptBuilder._create_section("Goal", 'goal', options['goal'])
         with col2:
-            selections['audience'] = PromptBuilder._create_section("Target Audience", 'audience', df, True)
-            selections['context'] = PromptBuilder._create_section("Context", 'context', df, True)
+            selections['audience'] = PromptBuilder._create_section("Target Audience", 'audience', options['audience'], True)
+            selections['context'] = PromptBuilder._create_section("Context", 'context', options['context'], True)
         with col3:
-            selections['output'] = PromptBuilder._create_section("Output", 'output', df, True)
-            selections['tone'] = PromptBuilder._create_section("Tone", 'tone', df)
+            selections['output'] = PromptBuilder._create_section("Output", 'output', options['output'], True)
+            selections['tone'] = PromptBuilder._create_section("Tone", 'tone', options['tone'])
         
         recursive_feedback = st.checkbox("Request recursive feedback")
-        prompt = PromptBuilder._generate_prompt(selections, df, recursive_feedback)
+        # Multiselect values are lists; turn them into tuples so the selections can key the cache
+        selections_key = tuple(
+            (section, tuple(data['selected']) if isinstance(data['selected'], list) else data['selected'], data['custom'])
+            for section, data in selections.items()
+        )
+        prompt = _build_prompt(selections_key, recursive_feedback, mtime)
         PromptBuilder._display_prompt(prompt)
 
     @staticmethod
-    def _create_section(title: str, element_type: str, df: pd.DataFrame, multi_select: bool = False) -> Dict[str, Any]:
-        elements = df[df['type'] == element_type]
-        options = ["Skip", "Write your own"] + elements['title'].tolist()
-        
+    def _create_section(title: str, element_type: str, options: List[str], multi_select: bool = False) -> Dict[str, Any]:
         if multi_select:
             selected = st.multiselect(title, options, key=f"select_{element_type}")
         else:
@@ -203,15 +464,15 @@ class PromptBuilder:
         if is_custom:
             custom_content = st.text_input(f"Custom {title}", key=f"custom_{element_type}")
         
-        return {'selected': selected, 'custom': custom_content, 'elements': elements}
+        return {'selected': selected, 'custom': custom_content}
 
     @staticmethod
-    def _generate_prompt(selections: Dict[str, Dict], df: pd.DataFrame, recursive_feedback: bool) -> str:
+    def _generate_prompt(selections: Dict[str, Dict], title_to_content: Dict[str, str], recursive_feedback: bool) -> str:
         prompt_parts = []
         for section, data in selections.items():
             sel = data['selected']
-            # Skip logic for both single and multi-select
-            if sel == "Skip" or (isinstance(sel, list) and (not sel or "Skip" in sel)):
+            # Skip logic for both single and multi-select; an empty multiselect is falsy
+            if not sel or sel == "Skip" or (isinstance(sel, list) and "Skip" in sel):
                 continue
                 
             section_title = section.title()
@@ -219,12 +480,12 @@ class PromptBuilder:
                 content_list = []
                 if "Write your own" in sel:
                     content_list.append(data['custom'])
-                # CHANGE: Optimized list comprehension for multi-select content gathering
-                content_list.extend([df[df['title'] == s]['content'].values[0] for s in sel if s not in ["Skip", "Write your own"]])
+                # .get() tolerates a title removed in another tab since the widget last rendered
+                content_list.extend(title_to_content.get(s, "") for s in sel if s not in ("Skip", "Write your own"))
                 content = "\n".join(content_list)
                 prompt_parts.append(f"{section_title}:\n{content}")
             else:
-                content = data['custom'] if sel == "Write your own" else df[df['title'] == sel]['content'].values[0]
+                content = data['custom'] if sel == "Write your own" else title_to_content.get(sel, "")
                 prompt_parts.append(f"{section_title}: {content}")
         
         prompt = "\n\n".join(prompt_parts)
@@ -243,39 +504,53 @@ class PromptBuilder:
                 if prompt_name:
                     DataManager.save_prompt(prompt_name, prompt)
                     st.success("Saved!")
+                    # App-wide rerun, like Add Element: the Browse Prompts tab has to pick up the new entry
+                    st.rerun()
                 else:
                     st.error("Name required.")
 
 class PromptBrowser:
     @staticmethod
+    @st.fragment
     def render():
         if not os.path.exists('prompt_history.csv'):
             st.warning("No history found.")
             return
         
-        df = pd.read_csv('prompt_history.csv')
+        df = DataManager.get_session_data('prompt_history.csv', PROMPT_HISTORY_COLUMNS)
         
         # NEW FEATURE: Download History Button
-        # Encodes dataframe as CSV for browser download
-        csv = df.to_csv(index=False).encode('utf-8')
         st.download_button(
             label="📥 Download History as CSV",
-            data=csv,
+            data=_history_csv_bytes(DataManager.get_mtime('prompt_history.csv')),
             file_name=f"prompt_history_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv",
         )
         
+        # Only the most recent prompts get widgets; older ones are reachable by raising the limit
+        tail_n = st.number_input("Show last", min_value=1, value=HISTORY_SHOW_LAST, step=1, key="history_tail")
+        
         # CHANGE: Used iloc[::-1] to display the most recent prompts at the top
-        for index, row in df.iloc[::-1].iterrows(): 
-            with st.expander(f"{row['name']} ({row['timestamp']})", expanded=False):
-                st.text_area("Content", value=row['prompt'], height=150, key=f"hist_{index}")
+        # Collapsed expanders still build their contents, so a prompt's text area is only created once opened
+        opened_history = st.session_state.setdefault('opened_history', set())
+        for row in df.tail(tail_n).iloc[::-1].itertuples():
+            with st.expander(f"{row.name} ({row.timestamp})", expanded=False):
+                if row.Index in opened_history:
+                    st.text_area("Content", value=row.prompt, height=150, key=f"hist_{row.Index}")
+                elif st.button("Show", key=f"show_{row.Index}"):
+                    opened_history.add(row.Index)
+                    rerun_tab()
 
 def main():
     # CHANGE: Optimized page config for the layout
     st.set_page_config(layout="wide", page_title="KMo's Prompt Tool")
     set_theme()
+    # Parse both stores once per session up front; the tabs reuse these copies across reruns
+    DataManager.get_session_data('prompt_elements.csv', CSV_COLUMNS)
+    DataManager.get_session_data('prompt_history.csv', PROMPT_HISTORY_COLUMNS)
     st.title("KMo's Prompt Creation Tool")
     
+    # Each tab's render is an st.fragment, so widget interactions only rerun that tab
     tabs = st.tabs(["Element Creator", "Element Editor", "Prompt Builder", "Browse Prompts"])
     with tabs[0]: ElementCreator.render()
     with tabs[1]: ElementEditor.render()
@@ -0,0 +1,148 @@
+import os
+
+import pandas as pd
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from pb4 import CSV_COLUMNS, DataManager
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pb4.py')
+
+ELEMENTS = 'prompt_elements.csv'
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    # Every test gets its own store; caches and session copies are process-wide
+    monkeypatch.chdir(tmp_path)
+    DataManager.clear_caches()
+    st.session_state.clear()
+    DataManager.append_rows(ELEMENTS, CSV_COLUMNS, [
+        ['R1', 'role', 'be a teacher'],
+        ['G1', 'goal', 'teach'],
+        ['A1', 'audience', 'kids'],
+        ['A2', 'audience', 'adults'],
+        ['T1', 'tone', 'warm'],
+        ['C1', 'context', 'school'],
+        ['O1', 'output', 'list'],
+        ['O2', 'output', 'table'],
+    ])
+
+
+def titles():
+    return DataManager.load_data(ELEMENTS, CSV_COLUMNS)['title'].tolist()
+
+
+def test_delete_append_update_compaction():
+    DataManager.delete_row(ELEMENTS, CSV_COLUMNS, 1)
+    assert titles() == ['R1', 'A1', 'A2', 'T1', 'C1', 'O1', 'O2']
+    # Tombstoned, not rewritten: the row is still in the file
+    assert os.path.exists(DataManager.tombstone_path(ELEMENTS))
+    assert len(pd.read_csv(ELEMENTS)) == 8
+
+    DataManager.append_rows(ELEMENTS, CSV_COLUMNS, [['N1', 'tone', 'new']])
+    df = DataManager.get_session_data(ELEMENTS, CSV_COLUMNS)
+    assert df['title'].tolist() == ['R1', 'A1', 'A2', 'T1', 'C1', 'O1', 'O2', 'N1']
+    # Surviving rows keep their file positions, so updates address the right row
+    assert df.index.tolist() == [0, 2, 3, 4, 5, 6, 7, 8]
+
+    df.at[3, 'content'] = 'grown-ups'
+    DataManager.save_data(df, ELEMENTS)
+    # A full save compacts: the log is gone and the file holds only live rows
+    assert not os.path.exists(DataManager.tombstone_path(ELEMENTS))
+    on_disk = pd.read_csv(ELEMENTS)
+    assert on_disk['title'].tolist() == ['R1', 'A1', 'A2', 'T1', 'C1', 'O1', 'O2', 'N1']
+    assert on_disk.loc[2, 'content'] == 'grown-ups'
+
+    DataManager.delete_row(ELEMENTS, CSV_COLUMNS, 0)
+    DataManager.delete_row(ELEMENTS, CSV_COLUMNS, 1)
+    assert os.path.exists(DataManager.tombstone_path(ELEMENTS))
+    # Third delete pushes tombstones past COMPACT_DELETED_RATIO and triggers a rewrite
+    DataManager.delete_row(ELEMENTS, CSV_COLUMNS, 2)
+    assert not os.path.exists(DataManager.tombstone_path(ELEMENTS))
+    assert pd.read_csv(ELEMENTS)['title'].tolist() == ['T1', 'C1', 'O1', 'O2', 'N1']
+    assert titles() == ['T1', 'C1', 'O1', 'O2', 'N1']
+
+
+def test_tombstones_ignored_when_store_replaced():
+    DataManager.delete_row(ELEMENTS, CSV_COLUMNS, 1)
+    # e.g. a git checkout swaps in a different file while the log still exists
+    pd.DataFrame({'title': ['X', 'Y'], 'type': ['role', 'goal'], 'content': ['x', 'y']}).to_csv(ELEMENTS, index=False)
+    DataManager.clear_caches()
+    assert titles() == ['X', 'Y']
+
+
+def test_session_copy_refreshes_without_mtime_change(monkeypatch):
+    # Simulate a filesystem whose timestamps are too coarse to tell writes apart
+    monkeypatch.setattr(DataManager, 'get_mtime', staticmethod(lambda filename: 1.0))
+    DataManager.get_session_data(ELEMENTS, CSV_COLUMNS)
+    DataManager.append_rows(ELEMENTS, CSV_COLUMNS, [['N1', 'tone', 'new']])
+    assert DataManager.get_session_data(ELEMENTS, CSV_COLUMNS)['title'].iloc[-1] == 'N1'
+    DataManager.delete_row(ELEMENTS, CSV_COLUMNS, 0)
+    assert 'R1' not in DataManager.get_session_data(ELEMENTS, CSV_COLUMNS)['title'].tolist()
+
+
+def write_store(text):
+    with open(ELEMENTS, 'w', newline='', encoding='utf-8') as f:
+        f.write(text)
+    DataManager.clear_caches()
+
+
+def test_append_to_store_without_trailing_newline():
+    write_store('title,type,content\nR1,role,x')
+    DataManager.append_rows(ELEMENTS, CSV_COLUMNS, [['N1', 'tone', 'new']])
+    df = DataManager.load_data(ELEMENTS, CSV_COLUMNS)
+    assert df.columns.tolist() == CSV_COLUMNS
+    assert df.values.tolist() == [['R1', 'role', 'x'], ['N1', 'tone', 'new']]
+
+
+def test_append_follows_hand_edited_header():
+    write_store('type,title,content,notes\nrole,R1,x,keep me\n')
+    DataManager.append_rows(ELEMENTS, CSV_COLUMNS, [['N1', 'tone', 'new']])
+    df = DataManager.load_data(ELEMENTS, CSV_COLUMNS)
+    assert df['title'].tolist() == ['R1', 'N1']
+    assert df['type'].tolist() == ['role', 'tone']
+    assert df['notes'].tolist() == ['keep me', '']
+
+
+def test_append_rewrites_when_header_lacks_columns():
+    write_store('title,type\nR1,role\n')
+    DataManager.append_rows(ELEMENTS, CSV_COLUMNS, [['N1', 'tone', 'new']])
+    assert pd.read_csv(ELEMENTS, dtype=str, keep_default_na=False).values.tolist() == [
+        ['R1', 'role', ''], ['N1', 'tone', 'new']
+    ]
+
+
+def test_add_element_to_store_without_trailing_newline():
+    write_store('title,type,content\nR1,role,x')
+    at = AppTest.from_file(APP).run()
+    at.text_input(key='new_title').input('N1')
+    at.text_area(key='new_content').input('new')
+    at.button(key='add_element').click().run()
+    assert not at.exception
+    assert titles() == ['R1', 'N1']
+
+
+def test_bulk_add_to_store_without_trailing_newline():
+    write_store('title,type,content\r\nR1,role,x')
+    DataManager.bulk_add([('N1', 'tone', 'new'), ('N2', 'goal', 'more')])
+    assert titles() == ['R1', 'N1', 'N2']
+
+
+def test_delete_from_store_with_reordered_header():
+    write_store('type,title,content,notes\nrole,R1,x,\ngoal,G1,y,keep\ntone,T1,z,\ncontext,C1,w,\noutput,O1,v,\n')
+    DataManager.delete_row(ELEMENTS, CSV_COLUMNS, 1)
+    # Below the compaction ratio, so the row is hidden by its tombstone alone
+    assert os.path.exists(DataManager.tombstone_path(ELEMENTS))
+    assert titles() == ['R1', 'T1', 'C1', 'O1']
+
+
+def test_opened_editors_reset_when_store_changes():
+    at = AppTest.from_file(APP).run()
+    at.button(key=next(b.key for b in at.button if b.key and b.key.startswith('open_0_'))).click().run()
+    assert len(at.session_state['opened_editors']) == 1
+    DataManager.append_rows(ELEMENTS, CSV_COLUMNS, [['N1', 'tone', 'new']])
+    at.run()
+    # Keys for the old file version can never match again, so they are dropped, not kept around
+    assert at.session_state['opened_editors'] == set()